@@ -9,7 +9,8 @@ Architecture:
 Data Layer:
 - All Oracle + QR logic is handled in:
     - db.py        → get_connection()
-    - services.py  → get_device_by_mac(), register_device_with_order()
+    - services.py  → get_device_by_mac(), get_device_by_token(),
+                     register_device_with_order()
 
 This file only defines:
     - Flask app
@@ -18,6 +19,11 @@ This file only defines:
 """
 
 import os
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
 from flask import (
     Flask,
     render_template,
@@ -26,10 +32,80 @@ from flask import (
     url_for,
     session,
     send_from_directory,
+    abort,
 )
+from flask_session import Session
+from jinja2 import FileSystemBytecodeCache
+import redis
 
 # Service layer: all DB + QR logic lives here
-from services import get_device_by_mac, register_device_with_order, QR_FOLDER, BASE_TRACK_URL
+from services import (
+    get_device_by_mac,
+    get_device_by_token,
+    register_device_with_order,
+    MAC_RE,
+    ensure_qr,
+    QR_FOLDER,
+)
+
+# ======================================================================
+#                               LOGGING
+# ======================================================================
+
+# Request threads only enqueue log records; a background listener thread
+# does the (blocking) write to stderr.
+#
+# The listener is started lazily, on the first record logged in each
+# process, so the gunicorn master (preload_app) never forks workers while
+# it has a live logging thread.
+_log_listener = None
+_log_listener_pid = None
+_log_listener_lock = threading.Lock()
+
+
+def _start_log_listener():
+    """
+    Start this process's listener thread (no-op if already running).
+    """
+    global _log_listener, _log_listener_pid
+    with _log_listener_lock:
+        if _log_listener_pid == os.getpid():
+            return
+        _log_handler.queue = queue.Queue(-1)
+        stream = logging.StreamHandler()
+        stream.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+        _log_listener = logging.handlers.QueueListener(_log_handler.queue, stream)
+        _log_listener.start()
+        _log_listener_pid = os.getpid()
+
+
+def _stop_log_listener():
+    """
+    Flush and stop the listener at exit (only in the process that started it).
+    """
+    if _log_listener is not None and _log_listener_pid == os.getpid():
+        _log_listener.stop()
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that starts the listener on first use in each process.
+    """
+
+    def emit(self, record):
+        if _log_listener_pid != os.getpid():
+            _start_log_listener()
+        super().emit(record)
+
+
+_log_handler = _LazyQueueHandler(None)
+logging.getLogger().addHandler(_log_handler)
+logging.getLogger().setLevel(logging.INFO)
+atexit.register(_stop_log_listener)
+
+logger = logging.getLogger(__name__)
 
 # ======================================================================
 #                         FLASK APP INITIALIZATION
@@ -43,6 +119,29 @@ app.secret_key = os.environ.get(
     "dev-secret-key-change-in-production",
 )
 
+# Templates: compiled once and kept in memory; compiled bytecode is also
+# cached on disk so restarted workers skip the Jinja compile step.
+# No directory argument: Jinja then uses its own per-user 0700 temp dir
+# and refuses one owned by someone else (cached bytecode gets executed).
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+app.jinja_env.auto_reload = False
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+# Server-side sessions in Redis (shared across workers/hosts).
+# Without REDIS_URL we fall back to Flask's signed-cookie sessions.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    app.config.update(
+        SESSION_TYPE="redis",
+        SESSION_REDIS=redis.Redis.from_url(REDIS_URL),
+        SESSION_PERMANENT=False,
+    )
+    Session(app)
+
+# QR PNGs never change once written, so let browsers cache them.
+# (Applied to /qr_codes/ only; CSS/logo keep Flask's default.)
+QR_MAX_AGE = 365 * 24 * 60 * 60  # 1 year
+
 # ======================================================================
 #                        EMPLOYEE AUTH (PROTOTYPE)
 # ======================================================================
@@ -66,6 +165,13 @@ EMPLOYEE_USERS = {
 #                  CUSTOMER-FACING ROUTES (PUBLIC)
 # ======================================================================
 
+# Malformed MACs (see services.MAC_RE) are rejected without an Oracle
+# round trip.
+INVALID_MAC_ERROR = (
+    "Invalid MAC address format. "
+    "Please use the form 9a:4b:7c:12:ff:09."
+)
+
 
 @app.route("/", methods=["GET", "POST"])
 def track_device():
@@ -82,13 +188,15 @@ def track_device():
 
     if request.method == "POST":
         # Extract and sanitize user input
-        device_id = request.form.get("device_id", "").strip()
+        device_id = request.form.get("device_id", "").strip().lower()
 
-        if device_id:
+        if device_id and not MAC_RE.match(device_id):
+            error = INVALID_MAC_ERROR
+        elif device_id:
             # Oracle lookup handled in services.py
             device = get_device_by_mac(device_id)
 
-        if device is None:
+        if device is None and error is None:
             error = (
                 "Device ID not found. Please verify your MAC address "
                 "or contact the recycling center."
@@ -115,16 +223,20 @@ def track_device_direct(device_id):
         http://YOUR_PUBLIC_URL/track/9a:4b:7c:12:ff:09
 
     Behavior:
+        - Rejects malformed MACs before touching Oracle
         - Uses services.get_device_by_mac(device_id)
         - No authentication required (public tracking)
     """
     error = None
     device = None
+    device_id = device_id.strip().lower()
 
-    if device_id:
+    if not MAC_RE.match(device_id):
+        error = INVALID_MAC_ERROR
+    else:
         device = get_device_by_mac(device_id)
 
-    if device is None:
+    if device is None and error is None:
         error = "Device ID not found. Please contact the recycling center."
 
     sample_ids = []  # kept for template compatibility
@@ -138,6 +250,35 @@ def track_device_direct(device_id):
     )
 
 
+@app.route("/t/<token>", methods=["GET"])
+def track_device_short(token):
+    """
+    Short QR Code Landing Page: Direct device lookup by QR token
+
+    URL example (inside QR):
+        http://YOUR_PUBLIC_URL/t/DdWy1qDH
+
+    Behavior:
+        - Uses services.get_device_by_token(token)
+        - Renders the same page as /track/<device_id>
+    """
+    error = None
+    device = get_device_by_token(token)
+
+    if device is None:
+        error = "Device ID not found. Please contact the recycling center."
+
+    sample_ids = []  # kept for template compatibility
+
+    return render_template(
+        "track.html",
+        device_id=device["mac_addr"] if device else token,
+        device=device,
+        error=error,
+        sample_ids=sample_ids,
+    )
+
+
 # ======================================================================
 #                 EMPLOYEE PORTAL ROUTES (AUTHENTICATED)
 # ======================================================================
@@ -164,6 +305,7 @@ def employee_login():
             # Create authenticated session
             session["employee_username"] = username
             session["employee_role"] = user.get("role", "Tech")
+            session["employee_full_name"] = user.get("full_name", username)
             return redirect(url_for("employee_dashboard"))
         else:
             error = "Invalid credentials. Please try again."
@@ -189,9 +331,8 @@ def employee_dashboard():
     if not username:
         return redirect(url_for("employee_login"))
 
-    user = EMPLOYEE_USERS.get(username, {})
-    full_name = user.get("full_name", username)
-    role = user.get("role", "Employee")
+    full_name = session.get("employee_full_name", username)
+    role = session.get("employee_role", "Employee")
 
     return render_template(
         "employee_dashboard.html",
@@ -225,19 +366,25 @@ def employee_intake():
         result = register_device_with_order(request.form, employee_username)
 
      
-        # Build a fully qualified URL to the tracking page (no hard-coded localhost)
-        track_url = f"{BASE_TRACK_URL}{result['mac_addr']}"
+        # Fully qualified short tracking URL (same one encoded in the QR)
+        track_url = result["track_url"]
 
         # Store in session so the QR page can read it
         session["last_mac"] = result["mac_addr"]
         session["last_track_url"] = track_url
+        session["last_qr_filename"] = result["qr_filename"]
 
         # Redirect to clean QR page
         return redirect(url_for("employee_qr_page", device_id=result["device_id"]))
 
-    except Exception as e:
+    except ValueError:
+        # Bad MAC: nothing was written; tell the employee what to fix
+        message = {"type": "error", "text": INVALID_MAC_ERROR}
+        return render_template("employee_intake.html", message=message, result=None)
+
+    except Exception:
         # Log error for debugging; show generic message to user
-        print("Error during device intake:", e)
+        logger.exception("Error during device intake")
         message = {
             "type": "error",
             "text": (
@@ -255,12 +402,11 @@ def employee_qr_page(device_id):
     """
     mac_addr = session.get("last_mac")
     track_url = session.get("last_track_url")
+    qr_filename = session.get("last_qr_filename")
 
-    if not mac_addr or not track_url:
+    if not mac_addr or not track_url or not qr_filename:
         return "No QR data found. Please record intake again."
 
-    qr_filename = f"{device_id}.png"
-
     return render_template(
         "employee_qr.html",
         device_id=device_id,
@@ -282,9 +428,46 @@ def serve_qr_code(filename):
 
     This keeps QR generation logic in services.py,
     while Flask takes care of actually serving the image.
+
+    In production a front web server may serve PNGs that already exist
+    straight from disk, but this route must stay enabled as its fallback:
+    intake writes PNGs in the background, so right after intake the file
+    may not exist yet and only this route waits for / regenerates it.
+    For nginx:
+
+        location /qr_codes/ {
+            root /app;
+            try_files $uri @flask;   # missing PNG -> this route
+            expires 1y;
+            add_header Cache-Control "public, immutable";
+        }
     """
-    qr_folder = os.path.join(app.root_path, "qr_codes")
-    return send_from_directory(qr_folder, filename)
+    # Intake writes the PNG in the background (possibly in another
+    # worker); wait for it or regenerate it if it's missing
+    if not ensure_qr(filename):
+        abort(404)
+
+    # ETag + Last-Modified let repeat scans get a 304 with no body
+    response = send_from_directory(
+        QR_FOLDER,
+        filename,
+        max_age=QR_MAX_AGE,
+        conditional=True,
+        etag=True,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+# ======================================================================
+#                         TEMPLATE PRELOAD
+# ======================================================================
+
+# Compile every HTML template at import time. Under gunicorn's
+# preload_app the master does this once and forked workers share it.
+for _template_name in app.jinja_env.list_templates(extensions=["html"]):
+    app.jinja_env.get_template(_template_name)
 
 
 # ======================================================================
@@ -297,4 +480,6 @@ if __name__ == "__main__":
 
     On Render, you typically use gunicorn instead of this.
     """
+    # Pick up template edits while developing locally
+    app.jinja_env.auto_reload = True
     app.run(debug=True, host="0.0.0.0", port=5000)
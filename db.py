@@ -1,5 +1,6 @@
 # db.py
 import os
+import threading
 import oracledb   # <-- NEW
 
 """
@@ -10,16 +11,45 @@ ORACLE_USER = "C##LetsCycleToRecycle"
 ORACLE_PASSWORD = "Oracle16!a"
 ORACLE_DSN = "localhost/XE"   # project service name
 
+# Session pool sizes (override per environment)
+ORACLE_POOL_MIN = int(os.getenv("ORACLE_POOL_MIN", "2"))
+ORACLE_POOL_MAX = int(os.getenv("ORACLE_POOL_MAX", "10"))
+
+# Cached statements per connection (hot SQL skips re-parsing)
+ORACLE_STMT_CACHE_SIZE = int(os.getenv("ORACLE_STMT_CACHE_SIZE", "40"))
+
+# One pool per process, created on first use (not at import time, so
+# gunicorn's preload_app never shares pooled sockets across forked workers).
+# Connections are opened once and reused across requests.
+POOL = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global POOL
+    if POOL is None:
+        with _pool_lock:
+            if POOL is None:
+                POOL = oracledb.create_pool(
+                    user=ORACLE_USER,
+                    password=ORACLE_PASSWORD,
+                    dsn=ORACLE_DSN,
+                    min=ORACLE_POOL_MIN,
+                    max=ORACLE_POOL_MAX,
+                    increment=1,
+                    getmode=oracledb.POOL_GETMODE_WAIT,
+                    homogeneous=True,
+                    stmtcachesize=ORACLE_STMT_CACHE_SIZE,
+                )
+    return POOL
+
 def get_connection():
     """
-    Returns a new Oracle connection.
+    Returns an Oracle connection acquired from the session pool.
+
+    Calling conn.close() releases it back to the pool.
 
     Usage:
         from db import get_connection
         conn = get_connection()
     """
-    return oracledb.connect(
-        user=ORACLE_USER,
-        password=ORACLE_PASSWORD,
-        dsn=ORACLE_DSN,
-    )
\ No newline at end of file
+    return _get_pool().acquire()
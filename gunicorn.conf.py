@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+import os
+
+"""
+Gunicorn settings for LetsCycleToRecycle.
+
+The app is I/O-bound (Oracle round trips, QR file writes), so each
+worker process runs a pool of threads instead of one request at a time.
+
+Usage:
+    gunicorn app:app
+
+Each worker has its own Oracle session pool (db.py), so keep
+ORACLE_POOL_MAX >= threads.
+"""
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# gthread rather than gevent: no monkey-patching needed around oracledb
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+timeout = 30
+keepalive = 5
+
+# Import the app (and compile templates) once in the master before forking.
+# The Oracle pool is created lazily per worker, after the fork.
+preload_app = True
@@ -0,0 +1,55 @@
+-- indexes.sql
+-- Supporting columns and indexes for LetsCycleToRecycle.
+-- Run once against the project schema (after the tables are created).
+
+-- QR tracking token (random, see services.register_device_with_order).
+-- Resolves /t/<token> and names the QR PNG; rows from before this column
+-- keep NULL and are still tracked via /track/<mac>.
+ALTER TABLE Device ADD (QrToken VARCHAR2(16));
+CREATE UNIQUE INDEX ux_device_qrtoken ON Device (QrToken);
+
+-- Intake: Customer upsert by email (MERGE in services.register_device_with_order)
+--
+-- PRECONDITION: no duplicate emails. Earlier intakes could create them,
+-- and the CREATE below fails (ORA-01452) while any remain. Check with:
+--
+--   SELECT CustEmail, COUNT(*) FROM Customer
+--   WHERE CustEmail IS NOT NULL
+--   GROUP BY CustEmail HAVING COUNT(*) > 1;
+--
+-- and if rows come back, fold each duplicate into the lowest CustNo
+-- (the one intake already reuses) before creating the index:
+--
+--   UPDATE RecyclingOrder r
+--   SET CustNo = (SELECT MIN(c2.CustNo) FROM Customer c1
+--                 JOIN Customer c2 ON c2.CustEmail = c1.CustEmail
+--                 WHERE c1.CustNo = r.CustNo)
+--   WHERE CustNo IN (SELECT CustNo FROM Customer c
+--                    WHERE CustNo > (SELECT MIN(CustNo) FROM Customer
+--                                    WHERE CustEmail = c.CustEmail));
+--
+--   UPDATE Device d
+--   SET OrigCustNo = (SELECT MIN(c2.CustNo) FROM Customer c1
+--                     JOIN Customer c2 ON c2.CustEmail = c1.CustEmail
+--                     WHERE c1.CustNo = d.OrigCustNo)
+--   WHERE OrigCustNo IN (SELECT CustNo FROM Customer c
+--                        WHERE CustNo > (SELECT MIN(CustNo) FROM Customer
+--                                        WHERE CustEmail = c.CustEmail));
+--
+--   DELETE FROM Customer c
+--   WHERE CustNo > (SELECT MIN(CustNo) FROM Customer
+--                   WHERE CustEmail = c.CustEmail);
+--
+--   COMMIT;
+CREATE UNIQUE INDEX ux_customer_email ON Customer (CustEmail);
+
+-- Tracking: Device lookup by MAC (services.get_device_by_mac).
+-- Function-based so the lookup is case-insensitive; the app binds
+-- lowercased MACs. Not UNIQUE: a device MAC may be re-intaken.
+CREATE INDEX ix_device_mac_lower ON Device (LOWER(IotMacAddr));
+
+-- Tracking JOIN: Oracle does not index foreign keys automatically.
+CREATE INDEX ix_ordline_device ON OrdLine (DeviceID);
+CREATE INDEX ix_recyclingorder_cust ON RecyclingOrder (CustNo);
+-- Skip if OrdLine's primary key already leads with OrdNo.
+CREATE INDEX ix_ordline_ord ON OrdLine (OrdNo);
@@ -1,9 +1,19 @@
 # services.py
+import io
 import os
-import qrcode
+import re
+import json
+import logging
+import secrets
+import tempfile
+import concurrent.futures
+import redis
+import segno
 
 from db import get_connection
 
+logger = logging.getLogger(__name__)
+
 """
 Service layer for LetsCycleToRecycle.
 
@@ -28,6 +38,204 @@ os.makedirs(QR_FOLDER, exist_ok=True)
 # RENDER : https://<our-app>.onrender.com/track/
 BASE_TRACK_URL = os.getenv("BASE_TRACK_URL", "http://localhost:5000/track/")
 
+# Short URL actually encoded in new QR codes: <BASE_SHORT_URL><token>,
+# where token is a random string stored in Device.QrToken. Far fewer
+# characters than a full MAC address, and not derived from the
+# sequential DeviceID, so it can't be enumerated.
+BASE_SHORT_URL = os.getenv(
+    "BASE_SHORT_URL",
+    BASE_TRACK_URL.rsplit("track/", 1)[0] + "t/",
+)
+
+# secrets.token_urlsafe(6) -> 8 URL-safe chars (48 random bits)
+QR_TOKEN_BYTES = 6
+_QR_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{8}$")
+
+# QR symbol settings. L error correction, fixed scale/border. The version
+# is deliberately NOT fixed: with the short /t/<token> URL, best-fit gives
+# version 2 for short hosts (e.g. localhost) and version 3 for typical
+# public hosts, so pinning version 3 could only make symbols larger. The
+# best-fit search itself is cheap and only runs on a QR cache miss.
+QR_ERROR = "l"
+QR_SCALE = 6
+QR_BORDER = 2
+
+# QR PNGs are written in the background so intake doesn't wait on disk.
+# Pending writes are tracked per filename (see ensure_qr()).
+_QR_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+_pending_qr = {}
+
+
+# Canonical MAC format (lowercase, colon-separated: 9a:4b:7c:12:ff:09).
+# Enforced at intake and on the public tracking routes, so every stored
+# MAC is one that /track/<mac> accepts.
+MAC_RE = re.compile(r"^[0-9a-f]{2}(:[0-9a-f]{2}){5}$")
+
+
+# ---------------------------------------------------------------------
+# TRACKING CACHE CONFIG
+# ---------------------------------------------------------------------
+
+# Device records change rarely, so public lookups are cached briefly.
+# Without REDIS_URL every lookup goes straight to Oracle.
+REDIS_URL = os.getenv("REDIS_URL")
+DEVICE_CACHE_TTL = int(os.getenv("DEVICE_CACHE_TTL", "120"))  # seconds
+
+_redis = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
+
+# ---------------------------------------------------------------------
+# SQL
+# (module constants: the same text every call, so Oracle reuses the
+#  cursor from the pool's statement cache instead of re-parsing)
+# ---------------------------------------------------------------------
+
+_SQL_SELECT_DEVICE = """
+    SELECT
+        d.DeviceType,
+        d.Make,
+        d.Model,
+        d.SerialNo,
+        d.HazardClass,
+        d.WeightKg,
+        d.Status,
+        r.DropOffSite,
+        TO_CHAR(r.OrdDate, 'YYYY-MM-DD') AS OrdDate,
+        c.CustFirstName,
+        c.CustLastName,
+        d.IotMacAddr
+    FROM Device d
+    JOIN OrdLine        ol ON ol.DeviceID = d.DeviceID
+    JOIN RecyclingOrder  r ON r.OrdNo     = ol.OrdNo
+    JOIN Customer        c ON c.CustNo    = r.CustNo
+"""
+
+# :mac is bound lowercased (matches ix_device_mac_lower).
+# A MAC can be taken in more than once; the newest device wins.
+_SQL_GET_DEVICE = _SQL_SELECT_DEVICE + """    WHERE LOWER(d.IotMacAddr) = :mac
+    ORDER BY d.DeviceID DESC
+    FETCH FIRST 1 ROW ONLY
+"""
+
+_SQL_GET_DEVICE_BY_TOKEN = _SQL_SELECT_DEVICE + """    WHERE d.QrToken = :token
+"""
+
+_SQL_TOKEN_EXISTS = """
+    SELECT 1 FROM Device WHERE QrToken = :token
+"""
+
+_SQL_REGISTER_INTAKE = """
+    DECLARE
+        v_emp_no     Employee.EmpNo%TYPE;
+        v_cust_no    Customer.CustNo%TYPE;
+        v_ord_no     RecyclingOrder.OrdNo%TYPE;
+        v_device_id  Device.DeviceID%TYPE;
+    BEGIN
+        BEGIN
+            SELECT EmpNo INTO v_emp_no
+            FROM Employee
+            WHERE EmpEmail = :emp_email;
+        EXCEPTION
+            WHEN NO_DATA_FOUND THEN
+                RAISE_APPLICATION_ERROR(
+                    -20001,
+                    'No Employee found for username ' || :emp_email
+                );
+        END;
+
+        IF :cust_email IS NULL THEN
+            v_cust_no := seq_customer.NEXTVAL;
+            INSERT INTO Customer (
+                CustNo, CustFirstName, CustLastName, CustEmail
+            )
+            VALUES (
+                v_cust_no, :first_name, :last_name, NULL
+            );
+        ELSE
+            -- Upsert by email (backed by ux_customer_email);
+            -- a concurrent intake may win the insert race.
+            BEGIN
+                MERGE INTO Customer c
+                USING (SELECT :cust_email AS CustEmail FROM dual) s
+                ON (c.CustEmail = s.CustEmail)
+                WHEN NOT MATCHED THEN INSERT (
+                    CustNo, CustFirstName, CustLastName, CustEmail
+                )
+                VALUES (
+                    seq_customer.NEXTVAL, :first_name, :last_name,
+                    s.CustEmail
+                );
+            EXCEPTION
+                WHEN DUP_VAL_ON_INDEX THEN
+                    NULL;
+            END;
+
+            -- MIN(): tolerates duplicate emails left by the old
+            -- SELECT-then-INSERT race (until ux_customer_email exists)
+            SELECT MIN(CustNo) INTO v_cust_no
+            FROM Customer
+            WHERE CustEmail = :cust_email;
+        END IF;
+
+        v_ord_no := seq_order.NEXTVAL;
+        v_device_id := seq_device.NEXTVAL;
+
+        -- RecyclingOrder and Device only reference Customer, so they can
+        -- share one multi-table insert. OrdLine references both and stays
+        -- separate: INSERT ALL does not guarantee row order between tables.
+        INSERT ALL
+            INTO RecyclingOrder (
+                OrdNo, OrdDate, CustNo, EmpNo, DropOffSite
+            )
+            VALUES (
+                v_ord_no, SYSDATE, v_cust_no, v_emp_no, :dropoff_site
+            )
+            INTO Device (
+                DeviceID, DeviceType, Make, Model, SerialNo,
+                QRCode, QrToken, IotMacAddr, HazardClass, WeightKg,
+                Status, OrigCustNo
+            )
+            VALUES (
+                v_device_id, :device_type, :make, :model, :serial_no,
+                :qr_token || '.png', :qr_token, :mac_addr, :hazard_class,
+                :weight_kg, :status, v_cust_no
+            )
+        SELECT 1 FROM dual;
+
+        INSERT INTO OrdLine (
+            OrdNo, LineNo, DeviceID, ActionCode, Qty, Notes
+        )
+        VALUES (
+            v_ord_no, 1, v_device_id, 'Recycle', 1, :notes
+        );
+
+        :device_id := v_device_id;
+    END;
+"""
+
+
+# Device SELECT column (lowercased) -> template field
+_DEVICE_FIELDS = {
+    "devicetype":  "type",
+    "make":        "make",
+    "model":       "model",
+    "serialno":    "serial_no",
+    "hazardclass": "hazard_class",
+    "weightkg":    "weight_kg",
+    "status":      "status",
+    "dropoffsite": "dropoff_site",
+    "orddate":     "received_date",
+    "iotmacaddr":  "mac_addr",
+}
+
+# Recycling steps shown on the tracking page (same for every device)
+_TIMELINE = (
+    ("Received", "Device received at LetsCycleToRecycle center"),
+    ("Under Recycle Check", "Technician inspecting components"),
+    ("In Laboratory", "Hazardous materials being processed"),
+    ("Recycled", "Metals recovered and logged"),
+)
+
 
 # ---------------------------------------------------------------------
 # HELPERS
@@ -61,62 +269,161 @@ def _parse_weight(value: str, default: float = 1.0) -> float:
         return default
 
 
-def _generate_qr_for_mac(mac_addr: str, device_id: str) -> str:
+def _qr_png_bytes(track_url: str) -> bytes:
     """
-    Create a QR code PNG for the given MAC address.
+    Encode a tracking URL as PNG bytes.
+    """
+    qr = segno.make(track_url, error=QR_ERROR, micro=False, boost_error=False)
+
+    buf = io.BytesIO()
+    qr.save(buf, kind="png", scale=QR_SCALE, border=QR_BORDER)
+    return buf.getvalue()
+
+
+def _device_cache_key(mac_addr: str) -> str:
+    """
+    '9A:4B:7C:12:FF:09' -> 'dev:9a:4b:7c:12:ff:09'
+    """
+    return f"dev:{mac_addr.lower()}"
+
+
+def _generate_qr_for_token(qr_token: str) -> str:
+    """
+    Create a QR code PNG for the given device token.
+
+    The QR encodes the short tracking URL (BASE_SHORT_URL + token).
+    If the PNG already exists on disk it is reused as-is; otherwise
+    it is written by a background thread and this returns immediately.
 
     Returns:
-        qr_filename (e.g., '12345.png')
+        qr_filename (e.g., 'DdWy1qDH.png')
     """
-    track_url = BASE_TRACK_URL + mac_addr  # e.g. http://host/track/9a:4b...
-    img = qrcode.make(track_url)
+    track_url = BASE_SHORT_URL + qr_token  # e.g. http://host/t/DdWy1qDH
 
-    qr_filename = f"{device_id}.png"
+    qr_filename = f"{qr_token}.png"
     qr_path = os.path.join(QR_FOLDER, qr_filename)
-    img.save(qr_path)
+    if qr_filename in _pending_qr or os.path.exists(qr_path):
+        return qr_filename
+
+    future = _QR_POOL.submit(_write_qr_png, track_url, qr_path)
+    _pending_qr[qr_filename] = future
+    future.add_done_callback(lambda f: _pending_qr.pop(qr_filename, None))
 
     return qr_filename
 
 
+def _write_qr_png(track_url: str, qr_path: str):
+    """
+    Write the PNG to a temp file in QR_FOLDER, then atomically rename it
+    into place so readers never see a half-written image.
+
+    No fsync: a PNG lost in a crash is regenerated on request (ensure_qr()).
+    """
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=QR_FOLDER, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_qr_png_bytes(track_url))
+        os.replace(tmp_path, qr_path)
+    except Exception:
+        logger.exception("Error writing QR code %s", qr_path)
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def ensure_qr(qr_filename: str, timeout: float = 2.0) -> bool:
+    """
+    Make sure qr_codes/<qr_filename> exists before it is served.
+
+    - Waits (up to timeout seconds) for a background write in this process
+    - Otherwise, if the PNG is missing (written by another worker that
+      hasn't finished, or a failed/lost write), regenerates it
+      synchronously for '<token>.png' files of existing devices
+
+    Only '<token>.png' names are served; anything else (including legacy
+    '<DeviceID>.png' files, which are enumerable) is refused.
+
+    Returns:
+        True if the PNG is on disk, False otherwise.
+    """
+    qr_token, ext = os.path.splitext(qr_filename)
+    if ext != ".png" or not _QR_TOKEN_RE.match(qr_token):
+        return False
+
+    future = _pending_qr.get(qr_filename)
+    if future is not None:
+        try:
+            future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            pass
+
+    qr_path = os.path.join(QR_FOLDER, qr_filename)
+    if os.path.exists(qr_path):
+        return True
+
+    # Recently confirmed missing: skip the Oracle round trip
+    miss_key = f"qrmiss:{qr_token}"
+    if _redis is not None:
+        try:
+            if _redis.exists(miss_key):
+                return False
+        except Exception:
+            logger.warning("QR miss cache read failed", exc_info=True)
+
+    # Only render PNGs for real devices (no disk writes for junk tokens)
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(_SQL_TOKEN_EXISTS, {"token": qr_token})
+        exists = cur.fetchone() is not None
+        cur.close()
+        conn.close()
+    except Exception:
+        logger.exception("Error checking token %s for QR regeneration", qr_token)
+        return False
+
+    if not exists:
+        if _redis is not None:
+            try:
+                _redis.setex(miss_key, DEVICE_CACHE_TTL, 1)
+            except Exception:
+                logger.warning("QR miss cache write failed", exc_info=True)
+        return False
+
+    _write_qr_png(BASE_SHORT_URL + qr_token, qr_path)
+    return os.path.exists(qr_path)
+
+
 # ---------------------------------------------------------------------
 # READ OPERATION: CUSTOMER TRACKING
 # ---------------------------------------------------------------------
 
-def get_device_by_mac(mac_addr: str):
+def _lookup_device(key: str, sql: str, binds: dict):
     """
-    Look up a device by MAC address (IotMacAddr) in Oracle.
+    Run a device SELECT (Redis-cached under key).
 
     Returns:
         dict shaped like the template expects, or
         None if not found or on error.
     """
-    mac_addr = (mac_addr or "").strip()
-    if not mac_addr:
-        return None
+    if _redis is not None:
+        try:
+            cached = _redis.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception:
+            logger.warning("Device cache read failed", exc_info=True)
 
     try:
         conn = get_connection()
         cur = conn.cursor()
 
-        cur.execute("""
-            SELECT
-                d.DeviceType,
-                d.Make,
-                d.Model,
-                d.SerialNo,
-                d.HazardClass,
-                d.WeightKg,
-                d.Status,
-                r.DropOffSite,
-                TO_CHAR(r.OrdDate, 'YYYY-MM-DD') AS OrdDate,
-                c.CustFirstName,
-                c.CustLastName
-            FROM Device d
-            JOIN OrdLine        ol ON ol.DeviceID = d.DeviceID
-            JOIN RecyclingOrder  r ON r.OrdNo     = ol.OrdNo
-            JOIN Customer        c ON c.CustNo    = r.CustNo
-            WHERE d.IotMacAddr = :mac
-        """, {"mac": mac_addr})
+        cur.execute(sql, binds)
+        cols = [d[0].lower() for d in cur.description]
+        cur.rowfactory = lambda *args: dict(zip(cols, args))
 
         row = cur.fetchone()
         cur.close()
@@ -125,29 +432,59 @@ def get_device_by_mac(mac_addr: str):
         if not row:
             return None
 
-        return {
-            "type":          row[0],
-            "make":          row[1],
-            "model":         row[2],
-            "serial_no":     row[3],
-            "hazard_class":  row[4],
-            "weight_kg":     row[5],
-            "status":        row[6],
-            "dropoff_site":  row[7],
-            "received_date": row[8],
-            "customer_name": f"{row[9]} {row[10]}",
-            "timeline": [
-                ("Received", "Device received at LetsCycleToRecycle center"),
-                ("Under Recycle Check", "Technician inspecting components"),
-                ("In Laboratory", "Hazardous materials being processed"),
-                ("Recycled", "Metals recovered and logged"),
-            ],
-        }
+        result = {field: row[col] for col, field in _DEVICE_FIELDS.items()}
+        result["customer_name"] = f"{row['custfirstname']} {row['custlastname']}"
+        result["timeline"] = _TIMELINE
 
-    except Exception as e:
-        print("Error in get_device_by_mac:", e)
+        if _redis is not None:
+            try:
+                _redis.setex(
+                    key, DEVICE_CACHE_TTL, json.dumps(result, default=str)
+                )
+            except Exception:
+                logger.warning("Device cache write failed", exc_info=True)
+
+        return result
+
+    except Exception:
+        logger.exception("Error in device lookup")
+        return None
+
+
+def get_device_by_mac(mac_addr: str):
+    """
+    Look up a device by MAC address (IotMacAddr) in Oracle.
+
+    Returns:
+        dict shaped like the template expects, or
+        None if not found or on error.
+    """
+    mac_addr = (mac_addr or "").strip().lower()
+    if not mac_addr:
         return None
 
+    return _lookup_device(
+        _device_cache_key(mac_addr), _SQL_GET_DEVICE, {"mac": mac_addr}
+    )
+
+
+def get_device_by_token(token: str):
+    """
+    Look up a device by its short QR token (Device.QrToken).
+
+    Returns:
+        dict shaped like the template expects, or
+        None if the token is invalid, not found or on error.
+    """
+    token = (token or "").strip()
+    # Reject junk before any Redis or Oracle work
+    if not _QR_TOKEN_RE.match(token):
+        return None
+
+    return _lookup_device(
+        f"devtok:{token}", _SQL_GET_DEVICE_BY_TOKEN, {"token": token}
+    )
+
 
 # ---------------------------------------------------------------------
 # WRITE OPERATION: EMPLOYEE INTAKE
@@ -158,17 +495,18 @@ def register_device_with_order(form_data, employee_username: str):
     Core transaction for Phase 2:
 
     - Find EmpNo for logged-in employee
-    - Insert or reuse Customer (by email) via seq_customer
+    - Insert or reuse Customer (MERGE by email) via seq_customer
     - Insert RecyclingOrder via seq_order
     - Insert Device via seq_device (with QR code + MAC)
     - Insert OrdLine (1 line per device)
+    - Generate the QR code PNG once the transaction is committed
 
     Returns:
-        dict with { device_id, qr_filename, mac_addr }
+        dict with { device_id, qr_filename, mac_addr, track_url }
     """
 
     # ------------ Extract & normalize form fields ------------ #
-    mac_addr       = form_data.get("mac_address", "").strip()
+    mac_addr       = form_data.get("mac_address", "").strip().lower()
     device_type    = form_data.get("device_type", "").strip()
     make           = form_data.get("make", "").strip()
     model          = form_data.get("model", "").strip()
@@ -181,149 +519,84 @@ def register_device_with_order(form_data, employee_username: str):
     hazard_class   = form_data.get("hazard_class", "Medium").strip()
     weight_kg      = _parse_weight(form_data.get("weight_kg", "1.0"), default=1.0)
 
+    if not MAC_RE.match(mac_addr):
+        raise ValueError(f"Invalid MAC address {mac_addr!r}")
+
     cust_first, cust_last = _split_customer_name(customer_name)
     if not cust_first:
         cust_first = "Unknown"
     if not cust_last:
         cust_last = "Customer"
 
+    # Random public token for the QR URL / PNG name (Device.QrToken)
+    qr_token = secrets.token_urlsafe(QR_TOKEN_BYTES)
+    qr_filename = f"{qr_token}.png"
+
     conn = get_connection()
     cur = conn.cursor()
 
-    try:
-        # --------------------------------------------------
-        # 0) Look up EmpNo from Employee (username = EmpEmail)
-        # --------------------------------------------------
-        cur.execute("""
-            SELECT EmpNo
-            FROM Employee
-            WHERE EmpEmail = :email
-        """, {"email": employee_username})
-
-        row = cur.fetchone()
-        if not row:
-            raise Exception(f"No Employee found for username {employee_username!r}")
-        emp_no = row[0]   # NUMBER(10)
-
-        # --------------------------------------------------
-        # 1) Customer: reuse by email or create via seq_customer
-        # --------------------------------------------------
-        existing_cust_no = None
-        if customer_email:
-            cur.execute("""
-                SELECT CustNo
-                FROM Customer
-                WHERE CustEmail = :email
-            """, {"email": customer_email})
-            row = cur.fetchone()
-            if row:
-                existing_cust_no = row[0]
-
-        if existing_cust_no is not None:
-            cust_no_to_use = existing_cust_no
-        else:
-            cur.execute("SELECT seq_customer.NEXTVAL FROM dual")
-            cust_no_to_use = cur.fetchone()[0]  # NUMBER(10)
-
-            cur.execute("""
-                INSERT INTO Customer (
-                    CustNo, CustFirstName, CustLastName, CustEmail
-                )
-                VALUES (
-                    :cust_no, :first_name, :last_name, :email
-                )
-            """, {
-                "cust_no":    cust_no_to_use,
-                "first_name": cust_first,
-                "last_name":  cust_last,
-                "email":      customer_email
-            })
-
-        # --------------------------------------------------
-        # 2) Order: OrdNo from seq_order
-        # --------------------------------------------------
-        cur.execute("SELECT seq_order.NEXTVAL FROM dual")
-        ord_no = cur.fetchone()[0]
-
-        cur.execute("""
-            INSERT INTO RecyclingOrder (
-                OrdNo, OrdDate, CustNo, EmpNo, DropOffSite
-            )
-            VALUES (
-                :ord_no, SYSDATE, :cust_no, :emp_no, :dropoff_site
-            )
-        """, {
-            "ord_no":       ord_no,
-            "cust_no":      cust_no_to_use,
-            "emp_no":       emp_no,
-            "dropoff_site": dropoff_site
-        })
+    # DeviceID comes back through an OUT bind
+    device_id_var = cur.var(int)
 
+    try:
         # --------------------------------------------------
-        # 3) Device: DeviceID from seq_device + QR code
+        # One PL/SQL block = one Oracle round trip:
+        #   0) Look up EmpNo from Employee (username = EmpEmail)
+        #   1) Customer: MERGE by email, or create via seq_customer
+        #   2) Order: OrdNo from seq_order
+        #   3) Device: DeviceID from seq_device
+        #      (QRCode = '<token>.png'; the PNG itself
+        #       is written after commit)
+        #   4) Order line: one line per device
         # --------------------------------------------------
-        cur.execute("SELECT seq_device.NEXTVAL FROM dual")
-        device_id = cur.fetchone()[0]   # NUMBER(10)
-
-        qr_filename = _generate_qr_for_mac(mac_addr, str(device_id))
-
-        cur.execute("""
-            INSERT INTO Device (
-                DeviceID, DeviceType, Make, Model, SerialNo,
-                QRCode, IotMacAddr, HazardClass, WeightKg,
-                Status, OrigCustNo
-            )
-            VALUES (
-                :device_id, :device_type, :make, :model, :serial_no,
-                :qr_code, :mac_addr, :hazard_class, :weight_kg,
-                :status, :cust_no
-            )
-        """, {
-            "device_id":     device_id,
+        cur.execute(_SQL_REGISTER_INTAKE, {
+            "emp_email":     employee_username,
+            "cust_email":    customer_email,
+            "first_name":    cust_first,
+            "last_name":     cust_last,
+            "dropoff_site":  dropoff_site,
             "device_type":   device_type,
             "make":          make,
             "model":         model,
             "serial_no":     serial_no,
-            "qr_code":       qr_filename,
             "mac_addr":      mac_addr,
             "hazard_class":  hazard_class,
             "weight_kg":     weight_kg,
             "status":        status,
-            "cust_no":       cust_no_to_use
-        })
-
-        # --------------------------------------------------
-        # 4) Order line: one line per device
-        # --------------------------------------------------
-        cur.execute("""
-            INSERT INTO OrdLine (
-                OrdNo, LineNo, DeviceID, ActionCode, Qty, Notes
-            )
-            VALUES (
-                :ord_no, :line_no, :device_id, :action_code, :qty, :notes
-            )
-        """, {
-            "ord_no":      ord_no,
-            "line_no":     1,
-            "device_id":   device_id,
-            "action_code": "Recycle",
-            "qty":         1,
-            "notes":       notes
+            "notes":         notes,
+            "qr_token":      qr_token,
+            "device_id":     device_id_var
         })
 
         conn.commit()
 
-        return {
-            "device_id":   device_id,
-            "qr_filename": qr_filename,
-            "mac_addr":    mac_addr
-        }
+        device_id = device_id_var.getvalue()   # NUMBER(10)
 
     except Exception as e:
         conn.rollback()
-        print("Error in register_device_with_order:", e)
+        logger.error("register_device_with_order rolled back: %s", e)
         raise
 
     finally:
         cur.close()
         conn.close()
+
+    # --------------------------------------------------
+    # 5) QR code: rendered outside the transaction so the
+    #    connection isn't held while the PNG is encoded
+    # --------------------------------------------------
+    _generate_qr_for_token(qr_token)
+
+    # Drop any cached lookup so tracking shows the new record
+    if _redis is not None:
+        try:
+            _redis.delete(_device_cache_key(mac_addr))
+        except Exception:
+            logger.warning("Device cache invalidation failed", exc_info=True)
+
+    return {
+        "device_id":   device_id,
+        "qr_filename": qr_filename,
+        "mac_addr":    mac_addr,
+        "track_url":   BASE_SHORT_URL + qr_token
+    }